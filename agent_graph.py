@@ -31,14 +31,7 @@ def undercover_node(state: FraudState):
         chat_script_path="data/recruiter_chat_scripts.json"
     )
 
-    results = []
-    for job in state["flagged_jobs"]:
-        results.append(
-            undercover.simulate_conversation(
-                job["job_id"],
-                job.get("description", "")
-            )
-        )
+    results = undercover.simulate_batch(state["flagged_jobs"])
 
     return {"undercover_results": results}
 
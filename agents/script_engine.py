@@ -0,0 +1,124 @@
+import re
+import json
+from functools import lru_cache
+
+DEFAULT_SCRIPT_PATH = "data/recruiter_chat_scripts.json"
+APPLICANT_OPENER = "Hi, I'm interested in this job"
+BENIGN_TRIGGER = "none"
+
+# A negation near a payment word ("no registration fee", "never pay")
+NEGATION_CUE = re.compile(
+    r"\b(?:no|not|never|without|zero|free of)\b[^.;!?\n]{0,30}?"
+    r"\b(?:fee|fees|pay|payment|payments|charge|charges|deposit|upi)\b",
+    re.IGNORECASE
+)
+
+
+class ScriptEngine:
+    """Rule-based recruiter chat simulator backed by scripted conversations.
+
+    All trigger keywords are compiled into a single regex so each listing is
+    matched in one pass; the scam script whose trigger collects the most hits
+    wins, and the benign script is used only when no scam trigger matched.
+    Keywords should be high-precision phrases; listings with no hits, or
+    with scam hits next to a negation cue, are left for the LLM.
+    """
+
+    def __init__(self, scripts):
+        self.scripts = {}
+        self.keyword_to_trigger = {}
+
+        for script in scripts:
+            trigger = script.get("scam_trigger")
+            keywords = script.get("trigger_keywords")
+            if not keywords:
+                print(f"Chat script {script.get('script_id')} has no trigger_keywords... Skipping it.")
+                continue
+            if trigger in self.scripts:
+                print(f"Chat script {script.get('script_id')} repeats trigger '{trigger}'... Skipping it.")
+                continue
+            self.scripts[trigger] = script
+            for keyword in keywords:
+                self.keyword_to_trigger.setdefault(keyword.lower(), trigger)
+
+        # Longest keywords first so "no upfront payment" beats "no payment"
+        alternation = "|".join(
+            re.escape(k) for k in sorted(self.keyword_to_trigger, key=len, reverse=True)
+        )
+        self.pattern = re.compile(rf"\b(?:{alternation})\b", re.IGNORECASE) if alternation else None
+
+    def match(self, description):
+        """Return the best matching script for a listing, or None"""
+        if not self.pattern or not description:
+            return None
+
+        hits = {}
+        for found in self.pattern.findall(description):
+            trigger = self.keyword_to_trigger[found.lower()]
+            hits[trigger] = hits.get(trigger, 0) + 1
+        if not hits:
+            return None
+
+        # The benign script only applies when no scam trigger matched at all
+        scam_hits = {t: n for t, n in hits.items() if t != BENIGN_TRIGGER}
+        if not scam_hits:
+            return self.scripts[BENIGN_TRIGGER]
+
+        # "No registration fee" style wording is ambiguous; leave it to the LLM
+        if NEGATION_CUE.search(description):
+            return None
+
+        # Ties go to the script listed first in the file
+        order = list(self.scripts)
+        best = max(scam_hits, key=lambda t: (scam_hits[t], -order.index(t)))
+        return self.scripts[best]
+
+    def simulate(self, job_id, description):
+        """Play back the matched script, or return None if none covers it"""
+        script = self.match(description)
+        if script is None:
+            return None
+
+        conversation = [{"sender": "applicant", "message": APPLICANT_OPENER}]
+        conversation += [{"sender": "recruiter", "message": m} for m in script["messages"]]
+        return {
+            "job_id": job_id,
+            "scam_detected": script["scam_trigger"] != BENIGN_TRIGGER,
+            "conversation": conversation,
+            "script_id": script["script_id"]
+        }
+
+    def simulate_batch(self, jobs):
+        """Simulate many jobs; unmatched entries come back as None"""
+        return [self.simulate(job["job_id"], str(job.get("description", ""))) for job in jobs]
+
+
+def load_script_engine(path=DEFAULT_SCRIPT_PATH):
+    """Load and index a script file once per process.
+
+    A missing file is reported and not cached, so every listing falls back
+    to the LLM until it appears; a malformed file raises.
+    """
+    try:
+        return _load_script_engine(path)
+    except OSError as e:
+        print(f"Chat scripts unavailable ({str(e)})... Using LLM simulation only.")
+        return ScriptEngine([])
+
+
+@lru_cache(maxsize=None)
+def _load_script_engine(path):
+    with open(path, encoding="utf-8") as fh:
+        return ScriptEngine(json.load(fh))
+
+
+if __name__ == "__main__":
+    # Sanity check: no listing in the safe sample may be scripted as a scam
+    import csv
+
+    engine = load_script_engine()
+    with open("data/safe.csv", encoding="utf-8") as fh:
+        for job in csv.DictReader(fh):
+            result = engine.simulate(job["job_id"], job["description"])
+            assert result is None or not result["scam_detected"], job
+    print("data/safe.csv: no scripted scams")
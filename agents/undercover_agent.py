@@ -1,11 +1,34 @@
+import math
 from llm_utils import llm_undercover_simulation
+from agents.script_engine import DEFAULT_SCRIPT_PATH, load_script_engine
+
+
+def _description_text(job):
+    """Listing description as a string; missing or NaN (from pandas) becomes empty"""
+    value = job.get("description", "")
+    if value is None or (isinstance(value, float) and math.isnan(value)):
+        return ""
+    return str(value)
+
 
 class UndercoverAgent:
-    def __init__(self):  # ← NO ARGUMENTS NEEDED
-        """No chat scripts needed - uses LLM simulation"""
-        pass
-    
+    def __init__(self, chat_script_path=DEFAULT_SCRIPT_PATH):
+        """Scripted conversations first, LLM simulation for uncovered listings"""
+        self.engine = load_script_engine(chat_script_path)
+
     def simulate_conversation(self, job_id, job_description=""):
+        return self.simulate_batch([{"job_id": job_id, "description": job_description}])[0]
+
+    def simulate_batch(self, jobs):
+        # Normalise once so the script engine and the LLM see the same text
+        jobs = [{"job_id": job["job_id"], "description": _description_text(job)} for job in jobs]
+        results = self.engine.simulate_batch(jobs)
+        for i, result in enumerate(results):
+            if result is None:
+                results[i] = self._llm_simulation(jobs[i]["job_id"], jobs[i]["description"])
+        return results
+
+    def _llm_simulation(self, job_id, job_description):
         result = llm_undercover_simulation(job_description)
         return {
             "job_id": job_id,
@@ -6,7 +6,7 @@ from agents.undercover_agent import UndercoverAgent
 from agents.pattern_hunter_agent import PatternHunterAgent
 from agents.decision_agent import DecisionAgent
 
-from database.db import init_db, insert_event, get_connection
+from database.db import init_db, insert_event, fetch_recent_events
 
 # Initialize DB
 init_db()
@@ -93,13 +93,9 @@ elif mode == "Analyst / Developer":
                 # 2. Undercover Agent
                 st.subheader("2. Undercover Agent")
                 undercover = UndercoverAgent()
-                undercover_results = []
-                for _, row in flagged_jobs.iterrows():
-                    result = undercover.simulate_conversation(
-                        row["job_id"],
-                        row.get("description", "")
-                    )
-                    undercover_results.append(result)
+                undercover_results = undercover.simulate_batch(
+                    flagged_jobs.to_dict("records")
+                )
                 st.json(undercover_results)
                 
                 # 3. Pattern Hunter
@@ -148,9 +144,7 @@ elif mode == "Research / NGO":
     st.header("Scam Pattern Insights")
     
     try:
-        conn = get_connection()
-        df = pd.read_sql("SELECT * FROM scam_events ORDER BY timestamp DESC LIMIT 100", conn)
-        conn.close()
+        df = pd.DataFrame(fetch_recent_events(limit=100))
         
         if df.empty:
             st.info("No data yet. Run User or Analyst mode first.")
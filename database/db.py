@@ -1,40 +1,368 @@
 import sqlite3
 import os
-from datetime import datetime
+import re
+import gzip
+import json
+import time
+import uuid
+import zlib
+import hashlib
+from datetime import datetime, timedelta
 
 DB_PATH = "db.sqlite"
+ARCHIVE_DIR = "archive"
+
+# Texts longer than this (in bytes) are stored zlib-compressed
+COMPRESS_THRESHOLD = 512
+
+# Events are partitioned by calendar month of their timestamp
+PARTITION_FORMAT = "%Y-%m"
+
+# Retention windows in days, per event source ("default" covers the rest)
+RETENTION_DAYS = {
+    "default": int(os.getenv("FRAUDHOUND_RETENTION_DAYS", "90")),
+    "analyst": int(os.getenv("FRAUDHOUND_ANALYST_RETENTION_DAYS", "365")),
+}
+
+# Retention + incremental vacuum run at most once per interval (seconds)
+MAINTENANCE_INTERVAL = int(os.getenv("FRAUDHOUND_MAINTENANCE_INTERVAL", "3600"))
+VACUUM_PAGES = 500
+
+
+def _expand_text(body, compressed):
+    """Decode a stored text body (used as a SQL function too)"""
+    if body is None:
+        return None
+    if compressed:
+        return zlib.decompress(body).decode("utf-8")
+    return body if isinstance(body, str) else bytes(body).decode("utf-8")
+
 
 def init_db():
     """Create tables with timestamp column"""
-    conn = sqlite3.connect(DB_PATH)
+    # Autocommit mode so the schema change below runs in one explicit transaction
+    conn = sqlite3.connect(DB_PATH, isolation_level=None)
     cursor = conn.cursor()
-    
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS scam_events (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            text TEXT NOT NULL,
-            risk_score REAL NOT NULL,
-            source TEXT NOT NULL,
-            timestamp DATETIME DEFAULT CURRENT_TIMESTAMP
+
+    # auto_vacuum can only be switched on for an existing file by a full VACUUM
+    if cursor.execute("PRAGMA auto_vacuum").fetchone()[0] != 2:
+        cursor.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        cursor.execute("VACUUM")
+
+    cursor.execute("BEGIN")
+    try:
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS scam_texts (
+                hash TEXT PRIMARY KEY,
+                body BLOB NOT NULL,
+                compressed INTEGER NOT NULL DEFAULT 0,
+                length INTEGER NOT NULL
+            )
+        """)
+
+        columns = [row[1] for row in cursor.execute("PRAGMA table_info(scam_events)")]
+        if "text" in columns:
+            cursor.execute("ALTER TABLE scam_events RENAME TO scam_events_legacy")
+
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS scam_events (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                text_hash TEXT NOT NULL REFERENCES scam_texts(hash),
+                risk_score REAL NOT NULL,
+                source TEXT NOT NULL,
+                timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
+                partition_key TEXT NOT NULL DEFAULT (strftime('%Y-%m', 'now'))
+            )
+        """)
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_scam_events_timestamp ON scam_events (timestamp)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_scam_events_partition ON scam_events (partition_key, source)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_scam_events_text_hash ON scam_events (text_hash)")
+
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS db_meta (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL
+            )
+        """)
+
+        # Also resumes a migration left behind by an older, non-atomic run
+        legacy = cursor.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'scam_events_legacy'"
+        ).fetchone()
+        if legacy:
+            _migrate_legacy_events(cursor)
+
+        cursor.execute("COMMIT")
+    except Exception:
+        cursor.execute("ROLLBACK")
+        raise
+    finally:
+        conn.close()
+
+
+def _migrate_legacy_events(cursor):
+    """Move rows from the old inline-text schema into the deduplicated one"""
+    rows = cursor.execute(
+        "SELECT id, text, risk_score, source, timestamp FROM scam_events_legacy ORDER BY id"
+    ).fetchall()
+    for event_id, text, risk_score, source, timestamp in rows:
+        text_hash = _store_text(cursor, text)
+        taken = cursor.execute("SELECT 1 FROM scam_events WHERE id = ?", (event_id,)).fetchone()
+        cursor.execute(
+            "INSERT INTO scam_events (id, text_hash, risk_score, source, timestamp, partition_key) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (None if taken else event_id, text_hash, risk_score, source, timestamp,
+             _partition_for(timestamp))
         )
-    """)
-    
-    conn.commit()
-    conn.close()
+    cursor.execute("DROP TABLE scam_events_legacy")
+
+
+def _partition_for(timestamp):
+    """Partition key for a stored timestamp; unparseable values land in the current month"""
+    try:
+        return datetime.fromisoformat(str(timestamp)).strftime(PARTITION_FORMAT)
+    except (TypeError, ValueError):
+        return datetime.utcnow().strftime(PARTITION_FORMAT)
+
+
+def _store_text(cursor, text):
+    """Insert text once, keyed by its content hash, and return the hash"""
+    raw = text.encode("utf-8")
+    text_hash = hashlib.sha256(raw).hexdigest()
+
+    body, compressed = text, 0
+    if len(raw) > COMPRESS_THRESHOLD:
+        packed = zlib.compress(raw, 6)
+        if len(packed) < len(raw):
+            body, compressed = packed, 1
+
+    cursor.execute(
+        "INSERT OR IGNORE INTO scam_texts (hash, body, compressed, length) VALUES (?, ?, ?, ?)",
+        (text_hash, body, compressed, len(raw))
+    )
+    return text_hash
+
 
 def get_connection():
     """Get database connection"""
-    return sqlite3.connect(DB_PATH)
+    conn = sqlite3.connect(DB_PATH)
+    conn.create_function("expand_text", 2, _expand_text, deterministic=True)
+    return conn
+
 
 def insert_event(text, risk_score, source):
     """Insert scam event with timestamp"""
     conn = get_connection()
     cursor = conn.cursor()
-    
+
+    text_hash = _store_text(cursor, text)
     cursor.execute(
-        "INSERT INTO scam_events (text, risk_score, source) VALUES (?, ?, ?)",
-        (text, risk_score, source)
+        "INSERT INTO scam_events (text_hash, risk_score, source) VALUES (?, ?, ?)",
+        (text_hash, risk_score, source)
     )
-    
+
     conn.commit()
+    _maybe_run_maintenance(conn)
     conn.close()
+
+
+def fetch_recent_events(limit=100):
+    """Return the newest events with their text expanded, newest first"""
+    conn = get_connection()
+    conn.row_factory = sqlite3.Row
+    rows = conn.execute(
+        """
+        SELECT e.id, expand_text(t.body, t.compressed) AS text,
+               e.risk_score, e.source, e.timestamp
+        FROM scam_events e
+        JOIN scam_texts t ON t.hash = e.text_hash
+        ORDER BY e.timestamp DESC
+        LIMIT ?
+        """,
+        (limit,)
+    ).fetchall()
+    conn.close()
+    return [dict(row) for row in rows]
+
+
+def _archive_name(source, partition_key, run_id):
+    safe_source = re.sub(r"[^A-Za-z0-9_-]", "_", str(source)) or "unknown"
+    return f"scam_events_{safe_source}_{partition_key}_{run_id}_{uuid.uuid4().hex[:8]}.jsonl.gz"
+
+
+def _remove_stale_temp_files(max_age=MAINTENANCE_INTERVAL):
+    """Drop temp files left by a crashed run; their rows were never deleted"""
+    if not os.path.isdir(ARCHIVE_DIR):
+        return
+    for name in os.listdir(ARCHIVE_DIR):
+        path = os.path.join(ARCHIVE_DIR, name)
+        if name.endswith(".tmp") and time.time() - os.path.getmtime(path) > max_age:
+            os.remove(path)
+
+
+def archive_expired_partitions(now=None):
+    """Archive partitions older than their retention window to gzip files.
+
+    A partition is archived only once it lies entirely before the cutoff.
+    Each partition is read under a write lock, written and fsynced to a
+    temp file, linked into place under a unique name (never replacing an
+    existing archive), and only then deleted from the database. If the
+    delete fails the archive file is removed again, so rows always live in
+    the database, the archive, or briefly both. Returns the list of archive
+    files written.
+    """
+    now = now or datetime.utcnow()
+    run_id = now.strftime("%Y%m%dT%H%M%S")
+    conn = get_connection()
+    cursor = conn.cursor()
+    written = []
+
+    _remove_stale_temp_files()
+    groups = cursor.execute(
+        "SELECT DISTINCT source, partition_key FROM scam_events"
+    ).fetchall()
+    try:
+        for source, partition_key in groups:
+            days = RETENTION_DAYS.get(source, RETENTION_DAYS["default"])
+            partition_start = datetime.strptime(partition_key, PARTITION_FORMAT)
+            partition_end = (partition_start + timedelta(days=32)).replace(day=1)
+            if partition_end > now - timedelta(days=days):
+                continue
+
+            # Hold the write lock so the rows archived are exactly the rows deleted
+            cursor.execute("BEGIN IMMEDIATE")
+            rows = cursor.execute(
+                """
+                SELECT e.id, expand_text(t.body, t.compressed), e.risk_score, e.source, e.timestamp
+                FROM scam_events e
+                JOIN scam_texts t ON t.hash = e.text_hash
+                WHERE e.partition_key = ? AND e.source = ?
+                ORDER BY e.id
+                """,
+                (partition_key, source)
+            ).fetchall()
+            if not rows:
+                conn.rollback()
+                continue
+
+            os.makedirs(ARCHIVE_DIR, exist_ok=True)
+            path = os.path.join(ARCHIVE_DIR, _archive_name(source, partition_key, run_id))
+            tmp_path = path + ".tmp"
+            linked = False
+            try:
+                with open(tmp_path, "xb") as raw:
+                    with gzip.open(raw, "wt", encoding="utf-8") as fh:
+                        for event_id, text, risk_score, src, timestamp in rows:
+                            fh.write(json.dumps({
+                                "id": event_id,
+                                "text": text,
+                                "risk_score": risk_score,
+                                "source": src,
+                                "timestamp": timestamp
+                            }) + "\n")
+                    raw.flush()
+                    os.fsync(raw.fileno())
+
+                # link() fails instead of overwriting if the name already exists
+                os.link(tmp_path, path)
+                linked = True
+                os.remove(tmp_path)
+
+                cursor.executemany(
+                    "DELETE FROM scam_events WHERE id = ?",
+                    [(row[0],) for row in rows]
+                )
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                if linked and os.path.exists(path):
+                    os.remove(path)
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                raise
+
+            written.append(path)
+
+        if written:
+            cursor.execute(
+                "DELETE FROM scam_texts WHERE hash NOT IN (SELECT text_hash FROM scam_events)"
+            )
+            conn.commit()
+    finally:
+        conn.close()
+    return written
+
+
+def incremental_vacuum(pages=VACUUM_PAGES):
+    """Release up to `pages` free pages back to the filesystem"""
+    conn = get_connection()
+    conn.execute(f"PRAGMA incremental_vacuum({int(pages)})").fetchall()
+    conn.close()
+
+
+def _claim_maintenance(conn):
+    """Atomically take the maintenance slot if the interval has elapsed.
+
+    Returns the previous stamp (None if there was none) when claimed, or
+    False when another run holds the slot or the interval has not passed.
+    """
+    now = time.time()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        row = conn.execute("SELECT value FROM db_meta WHERE key = 'last_maintenance'").fetchone()
+        if row is None:
+            claimed = conn.execute(
+                "INSERT OR IGNORE INTO db_meta (key, value) VALUES ('last_maintenance', ?)",
+                (str(now),)
+            ).rowcount
+        else:
+            claimed = conn.execute(
+                "UPDATE db_meta SET value = ? "
+                "WHERE key = 'last_maintenance' AND CAST(value AS REAL) < ?",
+                (str(now), now - MAINTENANCE_INTERVAL)
+            ).rowcount
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+    if not claimed:
+        return False
+    return (row[0] if row else None), str(now)
+
+
+def _maybe_run_maintenance(conn):
+    """Run retention and incremental vacuum if the interval has elapsed.
+
+    Failures are logged, not raised: the event itself is already saved.
+    A failed run hands the slot back so the next insert retries it.
+    """
+    claim = False
+    try:
+        claim = _claim_maintenance(conn)
+        if not claim:
+            return
+        previous, stamp = claim
+        archive_expired_partitions()
+        incremental_vacuum()
+    except Exception as e:
+        print(f"DB maintenance failed: {str(e)}... Will retry on next insert.")
+        if claim:
+            _release_maintenance(conn, previous, stamp)
+
+
+def _release_maintenance(conn, previous, stamp):
+    """Restore the stamp that was in place before a failed maintenance run"""
+    try:
+        if previous is None:
+            conn.execute(
+                "DELETE FROM db_meta WHERE key = 'last_maintenance' AND value = ?", (stamp,)
+            )
+        else:
+            conn.execute(
+                "UPDATE db_meta SET value = ? WHERE key = 'last_maintenance' AND value = ?",
+                (previous, stamp)
+            )
+        conn.commit()
+    except sqlite3.Error as e:
+        print(f"Could not release maintenance slot: {str(e)}")
@@ -14,11 +14,7 @@ undercover = UndercoverAgent(
     chat_script_path="data/recruiter_chat_scripts.json"
 )
 
-undercover_results = []
-for _, row in flagged_jobs.iterrows():
-    undercover_results.append(
-        undercover.simulate_conversation(row["job_id"])
-    )
+undercover_results = undercover.simulate_batch(flagged_jobs.to_dict("records"))
 
 
 pattern_hunter = PatternHunterAgent()